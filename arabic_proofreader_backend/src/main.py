@@ -11,6 +11,7 @@ from src.routes.proofreader import proofreader_bp
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
 app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
+app.config['MAX_CONTENT_LENGTH'] = 10 * 1024 * 1024  # Reject larger uploads while streaming
 
 # Enable CORS for all routes
 CORS(app)
@@ -1,10 +1,31 @@
+import io
 import os
 import tempfile
 import docx
 import fitz  # PyMuPDF
-from typing import Dict, Optional
+from typing import Dict, Optional, Union
 import re
 
+# Precompiled cleanup patterns
+_RE_BLANK_LINES = re.compile(r'\n\s*\n')
+_RE_SPACES = re.compile(r'[ \t]+')
+_RE_PAGE_NUMBER_LINE = re.compile(r'\n\d+\n')
+_RE_PAGE_NUMBER_EOL = re.compile(r'\n\d+\s*$', re.MULTILINE)
+_RE_ARTIFACTS = re.compile(r'[^\w\s\u0600-\u06FF\u0750-\u077F\u08A0-\u08FF\uFB50-\uFDFF\uFE70-\uFEFF.,;:!?()[\]{}"\'-]')
+
+# Arabic letter normalization in a single translate pass
+_NORMALIZE = str.maketrans({
+    'إ': 'ا', 'أ': 'ا', 'آ': 'ا',  # Alif variations
+    'ى': 'ي',                      # Ya variations
+    'ه': 'ة',                      # Ta Marbuta
+})
+
+def _open_pdf(source: Union[str, bytes]) -> fitz.Document:
+    """Open a PDF from a file path or from in-memory bytes"""
+    if isinstance(source, bytes):
+        return fitz.open(stream=source, filetype='pdf')
+    return fitz.open(source)
+
 class FileExtractor:
     """Enhanced file extraction service for PDF and Word documents"""
     
@@ -21,35 +42,35 @@ class FileExtractor:
         """Validate file size"""
         return file_size <= self.max_file_size
     
-    def extract_from_pdf(self, file_path: str) -> Dict:
-        """Extract text from PDF with enhanced error handling and metadata"""
+    def extract_from_pdf(self, file_path: str, detailed: bool = False) -> Dict:
+        """Extract text from PDF with enhanced error handling and metadata
+        
+        Per-page texts and word counts are only built when detailed is True.
+        """
+        return self._extract_pdf(file_path, detailed)
+    
+    def extract_from_pdf_bytes(self, data: bytes, detailed: bool = False) -> Dict:
+        """Extract text from an in-memory PDF without writing it to disk"""
+        return self._extract_pdf(data, detailed)
+    
+    def _extract_pdf(self, source: Union[str, bytes], detailed: bool) -> Dict:
+        """Extract text and metadata from a PDF path or bytes"""
         try:
-            doc = fitz.open(file_path)
+            doc = _open_pdf(source)
             
             # Extract metadata
             metadata = doc.metadata
             page_count = doc.page_count
             
             # Extract text from all pages
-            full_text = ""
-            page_texts = []
-            
-            for page_num in range(page_count):
-                page = doc[page_num]
-                page_text = page.get_text()
-                page_texts.append({
-                    'page_number': page_num + 1,
-                    'text': page_text,
-                    'word_count': len(page_text.split())
-                })
-                full_text += page_text + "\n"
+            raw_pages = [doc[page_num].get_text() for page_num in range(page_count)]
             
             doc.close()
             
             # Clean extracted text
-            full_text = self._clean_extracted_text(full_text)
+            full_text = self._clean_extracted_text("\n".join(raw_pages) + "\n")
             
-            return {
+            result = {
                 'success': True,
                 'text': full_text,
                 'metadata': {
@@ -60,7 +81,6 @@ class FileExtractor:
                     'page_count': page_count,
                     'file_type': 'PDF'
                 },
-                'pages': page_texts,
                 'stats': {
                     'total_words': len(full_text.split()),
                     'total_characters': len(full_text),
@@ -68,6 +88,18 @@ class FileExtractor:
                 }
             }
             
+            if detailed:
+                result['pages'] = [
+                    {
+                        'page_number': page_num + 1,
+                        'text': page_text,
+                        'word_count': len(page_text.split())
+                    }
+                    for page_num, page_text in enumerate(raw_pages)
+                ]
+            
+            return result
+            
         except Exception as e:
             return {
                 'success': False,
@@ -77,12 +109,20 @@ class FileExtractor:
     
     def extract_from_docx(self, file_path: str) -> Dict:
         """Extract text from DOCX with enhanced features"""
+        return self._extract_docx(file_path)
+    
+    def extract_from_docx_bytes(self, data: bytes) -> Dict:
+        """Extract text from an in-memory DOCX without writing it to disk"""
+        return self._extract_docx(io.BytesIO(data))
+    
+    def _extract_docx(self, source: Union[str, io.BytesIO]) -> Dict:
+        """Extract text, structure and properties from a DOCX path or buffer"""
         try:
-            doc = docx.Document(file_path)
+            doc = docx.Document(source)
             
             # Extract text from paragraphs
             paragraphs = []
-            full_text = ""
+            text_parts = []
             
             for i, paragraph in enumerate(doc.paragraphs):
                 para_text = paragraph.text.strip()
@@ -92,7 +132,8 @@ class FileExtractor:
                         'text': para_text,
                         'style': paragraph.style.name if paragraph.style else 'Normal'
                     })
-                    full_text += para_text + "\n"
+                    text_parts.append(para_text)
+                    text_parts.append("\n")
             
             # Extract text from tables
             tables_text = []
@@ -111,13 +152,14 @@ class FileExtractor:
                 
                 # Add table text to full text
                 for row in table_content:
-                    full_text += " | ".join(row) + "\n"
+                    text_parts.append(" | ".join(row))
+                    text_parts.append("\n")
             
             # Extract document properties
             core_props = doc.core_properties
             
             # Clean extracted text
-            full_text = self._clean_extracted_text(full_text)
+            full_text = self._clean_extracted_text("".join(text_parts))
             
             return {
                 'success': True,
@@ -152,15 +194,15 @@ class FileExtractor:
     def _clean_extracted_text(self, text: str) -> str:
         """Clean and normalize extracted text"""
         # Remove excessive whitespace
-        text = re.sub(r'\n\s*\n', '\n\n', text)  # Multiple newlines to double newline
-        text = re.sub(r'[ \t]+', ' ', text)      # Multiple spaces/tabs to single space
+        text = _RE_BLANK_LINES.sub('\n\n', text)  # Multiple newlines to double newline
+        text = _RE_SPACES.sub(' ', text)           # Multiple spaces/tabs to single space
         
         # Remove page numbers and headers/footers patterns
-        text = re.sub(r'\n\d+\n', '\n', text)   # Standalone page numbers
-        text = re.sub(r'\n\d+\s*$', '', text, flags=re.MULTILINE)  # Page numbers at end of line
+        text = _RE_PAGE_NUMBER_LINE.sub('\n', text)  # Standalone page numbers
+        text = _RE_PAGE_NUMBER_EOL.sub('', text)      # Page numbers at end of line
         
         # Clean up common PDF extraction artifacts
-        text = re.sub(r'[^\w\s\u0600-\u06FF\u0750-\u077F\u08A0-\u08FF\uFB50-\uFDFF\uFE70-\uFEFF.,;:!?()[\]{}"\'-]', '', text)
+        text = _RE_ARTIFACTS.sub('', text)
         
         # Normalize Arabic text
         text = self._normalize_arabic_text(text)
@@ -170,16 +212,14 @@ class FileExtractor:
     def _normalize_arabic_text(self, text: str) -> str:
         """Normalize Arabic text"""
         # Normalize Arabic letters
-        text = re.sub(r'[إأآا]', 'ا', text)  # Normalize Alif variations
-        text = re.sub(r'[ىي]', 'ي', text)    # Normalize Ya variations
-        text = re.sub(r'[ةه]', 'ة', text)    # Normalize Ta Marbuta
+        text = text.translate(_NORMALIZE)
         
         # Remove diacritics (optional - might want to keep for academic texts)
         # text = re.sub(r'[\u064B-\u0652\u0670\u0640]', '', text)
         
         return text
     
-    def extract_text(self, file_path: str, filename: str) -> Dict:
+    def extract_text(self, file_path: str, filename: str, detailed: bool = False) -> Dict:
         """Main extraction method that routes to appropriate extractor"""
         
         # Validate file
@@ -203,7 +243,7 @@ class FileExtractor:
         ext = os.path.splitext(filename)[1].lower()
         
         if ext == '.pdf':
-            return self.extract_from_pdf(file_path)
+            return self.extract_from_pdf(file_path, detailed=detailed)
         elif ext in ['.docx', '.doc']:
             return self.extract_from_docx(file_path)
         else:
@@ -216,19 +256,51 @@ class FileExtractor:
     def get_file_info(self, file_path: str, filename: str) -> Dict:
         """Get basic file information without extracting content"""
         try:
-            file_size = os.path.getsize(file_path)
-            ext = os.path.splitext(filename)[1].lower()
-            
-            return {
-                'filename': filename,
-                'size_bytes': file_size,
-                'size_mb': round(file_size / (1024 * 1024), 2),
-                'extension': ext,
-                'is_supported': self.is_supported_file(filename),
-                'size_valid': self.validate_file_size(file_size)
-            }
+            return self.describe_file(filename, os.path.getsize(file_path))
         except Exception as e:
             return {
                 'error': f'خطأ في قراءة معلومات الملف: {str(e)}'
             }
+    
+    def describe_file(self, filename: str, file_size: int) -> Dict:
+        """Get basic file information from a known size"""
+        ext = os.path.splitext(filename)[1].lower()
+        
+        return {
+            'filename': filename,
+            'size_bytes': file_size,
+            'size_mb': round(file_size / (1024 * 1024), 2),
+            'extension': ext,
+            'is_supported': ext in self.supported_extensions,
+            'size_valid': self.validate_file_size(file_size)
+        }
+    
+    def process_upload(self, data: bytes, filename: str) -> Dict:
+        """Validate and extract an uploaded file in one pass
+        
+        Returns the file info alongside the extraction result.
+        """
+        info = self.describe_file(filename, len(data))
+        
+        if not info['is_supported']:
+            extraction = {
+                'success': False,
+                'error': 'نوع الملف غير مدعوم. يرجى رفع ملف PDF أو Word',
+                'error_type': 'unsupported_file_type'
+            }
+        elif not info['size_valid']:
+            extraction = {
+                'success': False,
+                'error': f'حجم الملف كبير جداً. الحد الأقصى {self.max_file_size // (1024*1024)} ميجابايت',
+                'error_type': 'file_too_large'
+            }
+        elif info['extension'] == '.pdf':
+            extraction = self.extract_from_pdf_bytes(data)
+        else:
+            extraction = self.extract_from_docx_bytes(data)
+        
+        return {
+            'info': info,
+            'extraction': extraction
+        }
 